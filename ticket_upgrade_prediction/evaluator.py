@@ -42,11 +42,35 @@ class Metrics:
     def to_dict(self) -> dict:
         return self.__dict__
 
+    def to_array(self) -> np.ndarray:
+        """Metric values in field order, missing ones as nan"""
+        return np.array(
+            [
+                np.nan if value is None else value
+                for value in self.__dict__.values()
+            ],
+            dtype=np.float64,
+        )
+
+    @classmethod
+    def from_array(cls, array: np.ndarray):
+        return cls(
+            *[None if np.isnan(value) else float(value) for value in array]
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: np.ndarray):
+        """Average (n_metrics_objects, n_metrics) array, skipping missing values"""
+        present = ~np.isnan(arrays)
+        sums = np.where(present, arrays, 0).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            return cls.from_array(sums / present.sum(axis=0))
+
     @classmethod
     def from_multiple_metrics(cls, *args):
-        metrics_list = [metric.to_dict() for metric in args]
-        metrics_df = pd.DataFrame(metrics_list).mean()
-        return cls(**metrics_df.to_dict())
+        return cls.from_arrays(
+            np.stack([metric.to_array() for metric in args])
+        )
 
     def get_metric_from_string(self, metric_name: str) -> float:
         """
@@ -86,11 +110,19 @@ class BaseEvaluator(ABC):
 
 
 class Evaluator(BaseEvaluator):
+    """
+    proba: precomputed predict_proba output on X, reused instead of calling the model again
+    threshold: if set, preds are the model's classes_ picked by proba > threshold instead of calling predict. Only
+    valid for binary classifiers whose predict thresholds proba at that value
+    """
+
     def __init__(
         self,
         model: BaseModel,
         X: pd.DataFrame,
         y: np.ndarray,
+        proba: Optional[np.ndarray] = None,
+        threshold: Optional[float] = None,
     ) -> None:
         self.model = model
         self._assert_model_has_proper_methods()
@@ -99,8 +131,13 @@ class Evaluator(BaseEvaluator):
         self.y = y
         self._assert_y_has_proper_type()
 
+        self.proba = (
+            self._get_proba()
+            if proba is None
+            else self._get_positive_class_proba(proba)
+        )
+        self.threshold = threshold
         self.preds = self._get_preds()
-        self.proba = self._get_proba()
 
     def __repr__(self) -> str:
         return (
@@ -130,17 +167,27 @@ class Evaluator(BaseEvaluator):
             )
 
     def _get_preds(self) -> np.ndarray:
+        if self.threshold is not None:
+            return np.asarray(self.model.classes_)[
+                (self.proba > self.threshold).astype(int)
+            ]
+
         return self.model.predict(self.X)
 
     def _get_proba(self) -> np.ndarray:
-        proba = self.model.predict_proba(self.X)
+        return self._get_positive_class_proba(self.model.predict_proba(self.X))
 
+    @staticmethod
+    def _get_positive_class_proba(proba) -> np.ndarray:
         if isinstance(proba, torch.Tensor):
             return proba.numpy().reshape(-1)
 
-        else:
+        elif proba.ndim == 2:
             return proba[:, 1]
 
+        else:
+            return proba
+
     def get_accuracy(self) -> float:
         return accuracy_score(y_true=self.y, y_pred=self.preds)  # type: ignore
 
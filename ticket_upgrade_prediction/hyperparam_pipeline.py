@@ -1,30 +1,35 @@
-import random
-import warnings
+import importlib
+import numbers
+import os
+from typing import Optional, Tuple, Union
 
-import catboost as ctb
-import lightgbm as lgb
 import numpy as np
+import optuna
 import pandas as pd
-import xgboost as xgb
+from joblib import Parallel, delayed
 from loguru import logger
-from pandas.core.common import SettingWithCopyWarning
+from optuna.pruners import HyperbandPruner
+from optuna.samplers import TPESampler
+from sklearn.compose import ColumnTransformer
 from sklearn.datasets import make_classification
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import KFold, ParameterGrid, StratifiedKFold
-from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV,
+    KFold,
+    ParameterGrid,
+    StratifiedKFold,
+)
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
 from ticket_upgrade_prediction.evaluator import Evaluator, Metrics
 
-warnings.simplefilter(action="ignore", category=SettingWithCopyWarning)
-
-from typing import Tuple
-
 
 class HyperparamPipeline:
     """
     Hyperparameter pipeline for parameter optimization
-    X: pandas dataframe with independent variables
+    X: pandas dataframe with independent variables, numeric columns are cast to float32
     y: pandas series with dependent variable
     model: any of xgb, lr, knn, cat, lgb
     param_space: space which one'd like to look over when searching for optimal hypers
@@ -32,9 +37,21 @@ class HyperparamPipeline:
     cols_to_scale: columns to scale within kfold cv
     classification: whether out target is classification or regression
     metric: what metric to optimize
+    n_splits: number of cv folds, computed once and shared by every searched config
+    n_jobs: number of processes used to evaluate searched configs in parallel, 1 runs configs and optuna trials
+    sequentially. Concurrent optuna trials are also capped at cpu_count // n_splits
+    random_state: seed of random search, halving search and the optuna sampler
+    early_stopping_rounds: if set, xgb and lgb grid/random search configs are scored with native xgb.cv/lgb.cv on the
+    unscaled features, stopping once the metric hasn't improved for that many rounds. Supports classification with
+    accuracy, roc_auc or pr_auc metrics. class_weight='balanced' is translated to scale_pos_weight, other sklearn only
+    params raise ValueError
 
-    Note: when using search_for_params user has to choose algo, either random or grid search. When using random search,
-    one has to pass n_iters parameter with its value corresponding to how many times the user wants to randomize params
+    Note: when using search_for_params user has to choose algo, either random, grid or optuna search. When using random
+    search, one has to pass n_iters parameter with its value corresponding to how many times the user wants to randomize
+    params. When using optuna search, one has to pass n_trials parameter instead. For optuna, list values in param_space
+    are treated as categorical choices and (low, high) tuples as int/float ranges. Halving search accepts optional
+    factor, resource, max_resources and n_candidates parameters, passing n_candidates switches it from grid to random
+    candidates. Resources other than n_samples (e.g. n_estimators) require max_resources
     """
 
     def __init__(
@@ -47,8 +64,18 @@ class HyperparamPipeline:
         cols_to_scale: list,
         classification: bool,
         metric: str,
+        n_splits: int = 5,
+        n_jobs: int = -1,
+        random_state: Optional[int] = None,
+        early_stopping_rounds: Optional[int] = None,
     ):
-        self.X, self.y = X, y
+        self.X = X.astype(
+            {
+                col: np.float32
+                for col in X.select_dtypes(include="number").columns
+            }
+        )
+        self.y = y
         self.model = model_type
         self.classification = classification
         self.cols_to_scale = cols_to_scale
@@ -57,134 +84,635 @@ class HyperparamPipeline:
         self.params = []
         self.param_space = param_space
         self.stratify = stratify
+        self.n_splits = n_splits
+        self.n_jobs = n_jobs
+        self.random_state = random_state
 
-    def get_best_params(self) -> Tuple[dict, float]:
-        metric_list = [
-            metric_obj.get_metric_from_string(self.metric)
-            for metric_obj in self.scores
+        model_constructors = self.get_model_constructors()
+        if (model_type, classification) not in model_constructors:
+            raise ValueError(
+                "this model is currently not supported. try any of: xgb, lr, knn, cat, lgb"
+            )
+        # import only the library of the selected model
+        module_name, class_name, self._default_model_params = (
+            model_constructors[(model_type, classification)]
+        )
+        self._model_cls = getattr(
+            importlib.import_module(module_name), class_name
+        )
+
+        self.early_stopping_rounds = early_stopping_rounds
+        if early_stopping_rounds is not None and (
+            not classification
+            or self.metric not in self.get_native_metrics().get(model_type, {})
+        ):
+            raise ValueError(
+                "early stopping is only supported for xgb and lgb classification with accuracy, roc_auc or pr_auc"
+            )
+        self._native_datasets = {}
+        self._rng = np.random.default_rng(random_state)
+        self._param_lists = {
+            k: tuple(v) for k, v in param_space.items() if isinstance(v, list)
+        }
+        self._param_fixed = {
+            k: v for k, v in param_space.items() if not isinstance(v, list)
+        }
+
+        # scaled columns go first, so that they are a contiguous slice (a view)
+        # of every fold and can be scaled in place
+        cols_to_scale = set(self.cols_to_scale)
+        scaled_cols = [col for col in self.X.columns if col in cols_to_scale]
+        other_cols = [
+            col for col in self.X.columns if col not in cols_to_scale
+        ]
+        self._n_scaled = len(scaled_cols)
+        self._X_np = self.X[scaled_cols + other_cols].to_numpy(
+            dtype=np.float32
+        )
+        self._y_np = np.ascontiguousarray(self.y.values).ravel()
+        self._scores_arr = np.empty(0, dtype=np.float64)
+        self._n_scores = 0
+
+        # split once, so every searched config shares the same folds
+        kf = StratifiedKFold(n_splits) if stratify else KFold(n_splits)
+        self._splits = [
+            (train_index.astype(np.int32), test_index.astype(np.int32))
+            for train_index, test_index in kf.split(self._X_np, self._y_np)
         ]
-        return self.params[np.argmax(metric_list)], np.max(metric_list)
+        # one scaler per split, fitted upfront so parallel workers receive
+        # them with self, no scalers when there is nothing to scale
+        self._scalers = (
+            [
+                StandardScaler(copy=False).fit(
+                    self._X_np[train_index, : self._n_scaled]
+                )
+                for train_index, _ in self._splits
+            ]
+            if self._n_scaled
+            else []
+        )
+
+    def get_best_params(self) -> Tuple[dict, float]:
+        best_idx = int(np.argmax(self._scores_arr[: self._n_scores]))
+        return self.params[best_idx], self._scores_arr[best_idx]
+
+    def record_score(self, iteration_params: dict, score: Metrics) -> None:
+        logger.info(f"score for params {iteration_params} -> {score}")
+        if self._n_scores == len(self._scores_arr):
+            self._scores_arr = np.concatenate(
+                [self._scores_arr, np.empty(max(16, self._n_scores))]
+            )
+        self._scores_arr[self._n_scores] = score.get_metric_from_string(
+            self.metric
+        )
+        self._n_scores += 1
+        self.params.append(iteration_params)
+        self.scores.append(score)
 
     def search_for_params(
-        self, searching_algo: str = "random", n_splits: int = 5, **kwargs
+        self, searching_algo: str = "random", **kwargs
     ) -> None:
+        if "n_splits" in kwargs:
+            raise ValueError(
+                "n_splits is no longer a search_for_params argument. Pass it to HyperparamPipeline constructor instead."
+            )
         logger.info(
             f"starting to serach for params using {searching_algo} search"
         )
         if searching_algo == "random":
-            self.optimize_hypers_using_random_search(
-                n_splits, kwargs["n_iters"]
-            )
+            self.optimize_hypers_using_random_search(kwargs["n_iters"])
         elif searching_algo == "grid":
-            self.optimize_hypers_using_grid_search(n_splits)
+            self.optimize_hypers_using_grid_search()
+        elif searching_algo == "optuna":
+            self.optimize_hypers_using_optuna(kwargs["n_trials"])
+        elif searching_algo == "halving":
+            self.optimize_hypers_using_halving(**kwargs)
         else:
             raise ValueError(
-                "Unrecognizable searching_algo param. Currently available are: random, grid."
+                "Unrecognizable searching_algo param. Currently available are: random, grid, optuna, halving."
             )
 
-    @staticmethod
-    def get_random_params(param_space: dict) -> dict:
+    def get_random_params(self) -> dict:
         return {
-            k: (random.choice(v) if type(v) == list else v)
-            for k, v in param_space.items()
+            **self._param_fixed,
+            **{
+                k: choices[self._rng.integers(len(choices))]
+                for k, choices in self._param_lists.items()
+            },
         }
 
-    def optimize_hypers_using_grid_search(self, n_splits: int) -> None:
-        for iteration_params in ParameterGrid(self.param_space):
-            self.append_params_and_calculate_scores(iteration_params, n_splits)
+    def get_n_estimators_ladders(self, params_list: list) -> list:
+        """
+        Group configs differing only in n_estimators, in ascending order,
+        so that boosters can warm start from the previous config in a ladder.
+        Configs that can't be warm started deterministically get their own
+        ladder, as their trees would differ from a cold fit
+        """
+        if self.model not in ("xgb", "lgb"):
+            return [[params] for params in params_list]
 
-    def append_params_and_calculate_scores(
-        self, iteration_params: dict, n_splits: int
-    ) -> None:
-        self.params.append(iteration_params)
-        score = self.create_splits_and_calc_scores(n_splits, iteration_params)
-        logger.info(f"score for params {iteration_params} -> {score}")
-        self.scores.append(score)
+        ladders = {}
+        for params in params_list:
+            if "n_estimators" not in params or not self.can_warm_start(params):
+                ladders[len(ladders)] = [params]
+                continue
+            key = repr(
+                sorted(
+                    (k, v) for k, v in params.items() if k != "n_estimators"
+                )
+            )
+            ladders.setdefault(key, []).append(params)
+        return [
+            sorted(ladder, key=lambda params: params.get("n_estimators", 0))
+            for ladder in ladders.values()
+        ]
 
-    def optimize_hypers_using_random_search(
-        self, n_splits: int, n_iters: int
-    ) -> None:
-        for i in range(n_iters):
-            iteration_params = self.get_random_params(self.param_space)
-            self.append_params_and_calculate_scores(iteration_params, n_splits)
+    @staticmethod
+    def can_warm_start(params: dict) -> bool:
+        """
+        Allow warm starting only plain gbtree / gbdt boosters without any
+        row or column sampling, the only ones matching a cold fit
+        """
+        boosting = {
+            params.get(k, default)
+            for k, default in (
+                ("booster", "gbtree"),
+                ("boosting_type", "gbdt"),
+                ("boosting", "gbdt"),
+                ("boost", "gbdt"),
+            )
+        }
+        if not boosting <= {"gbtree", "gbdt"}:
+            return False
+        if params.get("extra_trees") or params.get("extra_tree"):
+            return False
+        if "data_sample_strategy" in params:
+            return False
+        return not any(
+            (
+                k.startswith(("subsample", "colsample_", "sub_"))
+                or "fraction" in k
+                or k == "bagging"
+            )
+            and isinstance(v, numbers.Real)
+            and v < 1
+            for k, v in params.items()
+        )
 
-    def create_splits_and_calc_scores(
-        self, n_splits: int, iteration_params: dict
-    ) -> Metrics:
-        kf = StratifiedKFold(n_splits) if self.stratify else KFold(n_splits)
-        return Metrics.from_multiple_metrics(
-            *[
-                self.create_preds_for_hypers(
-                    train_index, test_index, iteration_params
-                )
-                for train_index, test_index in kf.split(self.X, self.y)
+    def optimize_hypers_using_grid_search(self) -> None:
+        self.calc_and_record_scores(list(ParameterGrid(self.param_space)))
+
+    def optimize_hypers_using_random_search(self, n_iters: int) -> None:
+        self.calc_and_record_scores(
+            [self.get_random_params() for _ in range(n_iters)]
+        )
+
+    def calc_and_record_scores(self, params_list: list) -> None:
+        ladders = self.get_n_estimators_ladders(params_list)
+        if self.n_jobs == 1:
+            ladders_scores = [
+                self.create_splits_and_calc_ladder_scores(ladder)
+                for ladder in ladders
             ]
+        else:
+            ladders_scores = Parallel(
+                n_jobs=self.n_jobs, backend="loky", batch_size="auto"
+            )(
+                delayed(self.create_splits_and_calc_ladder_scores)(
+                    [self.limit_model_threads(params) for params in ladder]
+                )
+                for ladder in ladders
+            )
+
+        for ladder, ladder_scores in zip(ladders, ladders_scores):
+            for iteration_params, (score, fitted_params) in zip(
+                ladder, ladder_scores
+            ):
+                self.record_score({**iteration_params, **fitted_params}, score)
+
+    def suggest_params(self, trial: optuna.Trial) -> dict:
+        params = {}
+        for name, value in self.param_space.items():
+            if isinstance(value, list):
+                params[name] = trial.suggest_categorical(name, value)
+            elif isinstance(value, tuple):
+                low, high = value
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = trial.suggest_int(name, low, high)
+                else:
+                    params[name] = trial.suggest_float(name, low, high)
+            else:
+                params[name] = value
+        return params
+
+    def optimize_hypers_using_optuna(self, n_trials: int) -> None:
+        # concurrent trials, each running its folds sequentially, capped by
+        # a positive n_jobs
+        n_jobs = max(1, (os.cpu_count() or 1) // self.n_splits)
+        if self.n_jobs > 0:
+            n_jobs = min(self.n_jobs, n_jobs)
+
+        def objective(trial: optuna.Trial) -> float:
+            iteration_params = self.suggest_params(trial)
+            fit_params = (
+                iteration_params
+                if n_jobs == 1
+                else self.limit_model_threads(iteration_params)
+            )
+            fold_metrics = []
+            for fold_idx in range(self.n_splits):
+                fold_metrics.append(
+                    self.create_preds_for_hypers(fold_idx, fit_params)
+                )
+                running_score = np.mean(
+                    [
+                        metric_obj.get_metric_from_string(self.metric)
+                        for metric_obj in fold_metrics
+                    ]
+                )
+                # resource is the number of completed folds, 1 to n_splits
+                trial.report(running_score, step=fold_idx + 1)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+
+            score = Metrics.from_multiple_metrics(*fold_metrics)
+            trial.set_user_attr("params", iteration_params)
+            trial.set_user_attr("metrics", score.to_dict())
+            return score.get_metric_from_string(self.metric)
+
+        # hyperband assigns trials to brackets by hashing the study name
+        study = optuna.create_study(
+            study_name=(
+                None
+                if self.random_state is None
+                else f"hyperparam_pipeline_{self.random_state}"
+            ),
+            direction="maximize",
+            sampler=TPESampler(multivariate=True, seed=self.random_state),
+            pruner=HyperbandPruner(
+                min_resource=1, max_resource=self.n_splits, reduction_factor=3
+            ),
         )
+        study.optimize(objective, n_trials=n_trials, n_jobs=n_jobs)
+
+        for trial in study.get_trials(
+            deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)
+        ):
+            self.record_score(
+                trial.user_attrs["params"],
+                Metrics(**trial.user_attrs["metrics"]),
+            )
 
-    def map_cols_to_scale_to_boolean(self):
-        return [col in self.cols_to_scale for col in list(X.columns)]
+    def get_sklearn_scoring(self) -> str:
+        """Map metric name to sklearn scorer, pr_auc is approximated by average precision"""
+        scoring_mapping = {
+            "accuracy": "accuracy",
+            "roc_auc": "roc_auc",
+            "precision": "precision",
+            "recall": "recall",
+            "f1": "f1",
+            "pr_auc": "average_precision",
+        }
 
-    def get_scaled_train_and_test_sets(
-        self, train_index: np.ndarray, test_index: np.ndarray
-    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-        scaler = StandardScaler()
-        X_train, X_test, y_train, y_test = (
-            self.X.iloc[train_index],
-            self.X.iloc[test_index],
-            self.y.iloc[train_index],
-            self.y.iloc[test_index],
+        if self.metric not in scoring_mapping.keys():
+            raise ValueError(
+                f"Metric not supported by halving search! Accepted names: {list(scoring_mapping.keys())}"
+            )
+
+        return scoring_mapping[self.metric]
+
+    def optimize_hypers_using_halving(
+        self,
+        factor: int = 3,
+        resource: str = "n_samples",
+        max_resources: Union[int, str] = "auto",
+        n_candidates: Optional[int] = None,
+    ) -> None:
+        model_params = {} if self.n_jobs == 1 else self.limit_model_threads({})
+        estimator = Pipeline(
+            [
+                (
+                    "scaler",
+                    ColumnTransformer(
+                        [("scale", StandardScaler(), self.cols_to_scale)],
+                        remainder="passthrough",
+                    ),
+                ),
+                ("model", self.determine_model(model_params)),
+            ]
         )
-        X_train.iloc[
-            :, self.map_cols_to_scale_to_boolean()
-        ] = scaler.fit_transform(
-            X_train.iloc[:, self.map_cols_to_scale_to_boolean()]
+        param_space = {
+            f"model__{k}": (v if isinstance(v, list) else [v])
+            for k, v in self.param_space.items()
+        }
+        search_kwargs = dict(
+            factor=factor,
+            resource=(
+                resource if resource == "n_samples" else f"model__{resource}"
+            ),
+            max_resources=max_resources,
+            cv=self._splits,
+            scoring=self.get_sklearn_scoring(),
+            n_jobs=self.n_jobs,
+            refit=False,
+            random_state=self.random_state,
         )
-        X_test.iloc[:, self.map_cols_to_scale_to_boolean()] = scaler.transform(
-            X_test.iloc[:, self.map_cols_to_scale_to_boolean()]
+        search = (
+            HalvingGridSearchCV(estimator, param_space, **search_kwargs)
+            if n_candidates is None
+            else HalvingRandomSearchCV(
+                estimator,
+                param_space,
+                n_candidates=n_candidates,
+                **search_kwargs,
+            )
         )
-        return X_train, X_test, y_train, y_test
+        search.fit(self.X, self._y_np)
+        self.cv_results = search.cv_results_
 
-    def create_preds_for_hypers(
-        self,
-        train_index: np.ndarray,
-        test_index: np.ndarray,
-        iteration_params: dict,
-    ) -> Metrics:
-        model = self.determine_model(iteration_params)
-        X_train, X_test, y_train, y_test = self.get_scaled_train_and_test_sets(
-            train_index, test_index
+        # only candidates from the last iteration were scored on full resource
+        last_iter = self.cv_results["iter"] == self.cv_results["iter"].max()
+        for params, score in zip(
+            np.array(self.cv_results["params"])[last_iter],
+            self.cv_results["mean_test_score"][last_iter],
+        ):
+            iteration_params = {
+                k.removeprefix("model__"): v for k, v in params.items()
+            }
+            self.record_score(
+                iteration_params, Metrics(**{self.metric: score})
+            )
+
+    def limit_model_threads(self, params: dict) -> dict:
+        """Single threaded boosters, so that parallel configs don't oversubscribe cores"""
+        if self.model in ("xgb", "lgb"):
+            return {"n_jobs": 1, **params}
+        elif self.model == "cat":
+            return {"thread_count": 1, **params}
+        return params
+
+    def create_splits_and_calc_scores(self, iteration_params: dict) -> Metrics:
+        [(score, _)] = self.create_splits_and_calc_ladder_scores(
+            [iteration_params]
         )
-        model.fit(X_train, y_train.values.ravel())
-        ev = Evaluator(model=model, X=X_test, y=y_test)
-        return ev.get_all_metrics()
+        return score
+
+    def create_splits_and_calc_ladder_scores(self, ladder: list) -> list:
+        """
+        (metrics, params chosen while scoring) for each ladder config, the
+        latter being the early stopped n_estimators
+        """
+        if self.early_stopping_rounds is not None:
+            return [self.calc_native_cv_score(params) for params in ladder]
+
+        fold_metrics = [
+            self.create_preds_for_ladder(fold_idx, ladder)
+            for fold_idx in range(self.n_splits)
+        ]
+        return [
+            (Metrics.from_multiple_metrics(*params_metrics), {})
+            for params_metrics in zip(*fold_metrics)
+        ]
+
+    @staticmethod
+    def get_native_metrics() -> dict:
+        """metric -> native eval metric, error metrics are reported as 1 - error"""
+        return {
+            "xgb": {"accuracy": "error", "roc_auc": "auc", "pr_auc": "aucpr"},
+            "lgb": {
+                "accuracy": "binary_error",
+                "roc_auc": "auc",
+                "pr_auc": "average_precision",
+            },
+        }
+
+    def __getstate__(self) -> dict:
+        # native boosting datasets can't be pickled, parallel workers rebuild them
+        state = self.__dict__.copy()
+        state["_native_datasets"] = {}
+        return state
+
+    def get_native_params(self, iteration_params: dict) -> dict:
+        """
+        Translate sklearn wrapper params to native xgb/lgb ones, rejecting
+        those native cv would silently ignore
+        """
+        params = {**self._default_model_params, **iteration_params}
+        # only changes feature_importances_, not the fitted trees
+        params.pop("importance_type", None)
+
+        class_weight = params.pop("class_weight", None)
+        if class_weight == "balanced":
+            if "scale_pos_weight" in params or params.get("is_unbalance"):
+                raise ValueError(
+                    "class_weight can't be combined with scale_pos_weight or is_unbalance"
+                )
+            n_pos = np.count_nonzero(self._y_np)
+            params["scale_pos_weight"] = (len(self._y_np) - n_pos) / n_pos
+        elif class_weight is not None:
+            raise ValueError(
+                "only class_weight='balanced' is supported with early stopping, use scale_pos_weight instead"
+            )
+
+        unsupported = set(params) & {
+            "missing",
+            "enable_categorical",
+            "feature_types",
+            "callbacks",
+            "eval_metric",
+            "early_stopping_rounds",
+        }
+        if unsupported:
+            raise ValueError(
+                f"{sorted(unsupported)} params are not supported with early stopping"
+            )
+        if self.model == "xgb" and "n_jobs" in params:
+            params["nthread"] = params.pop("n_jobs")
+        return params
+
+    @staticmethod
+    def get_lgb_dataset_params() -> list:
+        """lgb params fixed at Dataset construction, including their sklearn names"""
+        return [
+            "max_bin",
+            "max_bins",
+            "max_bin_by_feature",
+            "min_data_in_bin",
+            "bin_construct_sample_cnt",
+            "subsample_for_bin",
+            "data_random_seed",
+            "use_missing",
+            "zero_as_missing",
+            "linear_tree",
+        ]
+
+    def calc_native_cv_score(self, iteration_params: dict) -> tuple:
+        """
+        Score config with the booster's own cv, trees are invariant to
+        feature scaling, so folds are built from the unscaled features once.
+        Returns the metrics and the best iteration as n_estimators
+        """
+        native_metric = self.get_native_metrics()[self.model][self.metric]
+        params = self.get_native_params(iteration_params)
+        num_boost_round = params.pop("n_estimators", 100)
 
-    def determine_model(self, params: dict):
         if self.model == "xgb":
-            if self.classification:
-                return xgb.XGBClassifier(
-                    objective="binary:logistic", verbosity=0, **params
+            import xgboost as xgb
+
+            if "xgb" not in self._native_datasets:
+                self._native_datasets["xgb"] = xgb.DMatrix(
+                    self._X_np, self._y_np
                 )
-            return xgb.XGBRegressor(
-                objective="reg:squarederror", verbosity=0, **params
-            )
-        elif self.model == "lr":
-            return LogisticRegression(**params)
-        elif self.model == "knn":
-            if self.classification:
-                return KNeighborsClassifier(**params)
-            return KNeighborsRegressor(**params)
-        elif self.model == "cat":
-            if self.classification:
-                return ctb.CatBoostClassifier(**params)
-            return ctb.CatBoostRegressor(**params)
-        elif self.model == "lgb":
-            if self.classification:
-                return lgb.LGBMClassifier(**params)
-            return lgb.LGBMRegressor(**params)
+            history = xgb.cv(
+                {**params, "eval_metric": native_metric},
+                self._native_datasets["xgb"],
+                num_boost_round=num_boost_round,
+                folds=self._splits,
+                early_stopping_rounds=self.early_stopping_rounds,
+            )
+            scores = history[f"test-{native_metric}-mean"].to_numpy()
         else:
-            raise ValueError(
-                "this model is currently not supported. try any of: xgb, lr, knn, cat, lgb"
+            import lightgbm as lgb
+
+            # binning params can't change on a constructed Dataset, so one
+            # is cached per combination of them. feature_pre_filter=False
+            # keeps features that a small min_child_samples could still split
+            dataset_params = {
+                k: v
+                for k, v in params.items()
+                if k in self.get_lgb_dataset_params()
+            }
+            key = repr(sorted(dataset_params.items()))
+            if key not in self._native_datasets:
+                self._native_datasets[key] = lgb.Dataset(
+                    self._X_np,
+                    self._y_np,
+                    params={**dataset_params, "feature_pre_filter": False},
+                    free_raw_data=False,
+                )
+            history = lgb.cv(
+                {
+                    **params,
+                    "objective": "binary",
+                    "metric": native_metric,
+                    "feature_pre_filter": False,
+                },
+                self._native_datasets[key],
+                num_boost_round=num_boost_round,
+                folds=self._splits,
+                callbacks=[
+                    lgb.early_stopping(
+                        self.early_stopping_rounds, verbose=False
+                    )
+                ],
             )
+            scores = next(
+                np.asarray(values)
+                for key, values in history.items()
+                if key.endswith(f"{native_metric}-mean")
+            )
+
+        if native_metric.endswith("error"):
+            scores = 1 - scores
+        best_iteration = int(np.argmax(scores)) + 1
+        logger.info(
+            f"best iteration for params {iteration_params} -> {best_iteration}"
+        )
+        score = Metrics(**{self.metric: float(scores[best_iteration - 1])})
+        return score, {"n_estimators": best_iteration}
+
+    def get_scaled_train_and_test_sets(
+        self, fold_idx: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        train_index, test_index = self._splits[fold_idx]
+        # fancy indexing already returns owned copies of the fold
+        X_train, X_test = self._X_np[train_index], self._X_np[test_index]
+        if self._n_scaled:
+            scaler = self._scalers[fold_idx]
+            for X_part in (X_train, X_test):
+                X_scaled_part = X_part[:, : self._n_scaled]
+                scaled = scaler.transform(X_scaled_part)
+                if not np.shares_memory(scaled, X_scaled_part):
+                    X_scaled_part[:] = scaled
+        return X_train, X_test, self._y_np[train_index], self._y_np[test_index]
+
+    def create_preds_for_hypers(
+        self, fold_idx: int, iteration_params: dict
+    ) -> Metrics:
+        return self.create_preds_for_ladder(fold_idx, [iteration_params])[0]
+
+    def create_preds_for_ladder(self, fold_idx: int, ladder: list) -> list:
+        X_train, X_test, y_train, y_test = self.get_scaled_train_and_test_sets(
+            fold_idx
+        )
+        ladder_metrics, prev_model = [], None
+        for iteration_params in ladder:
+            if prev_model is not None and self.get_n_trees(
+                prev_model
+            ) >= iteration_params.get("n_estimators", 0):
+                prev_model = None
+            model = self.determine_model(iteration_params, prev_model)
+            model.fit(
+                X_train, y_train, **self.get_warm_start_kwargs(prev_model)
+            )
+            # searched models are binary classifiers predicting proba > 0.5
+            ev = Evaluator(
+                model=model,
+                X=X_test,
+                y=y_test,
+                proba=model.predict_proba(X_test),
+                threshold=0.5,
+            )
+            ladder_metrics.append(ev.get_all_metrics())
+            if self.model in ("xgb", "lgb"):
+                prev_model = model
+        return ladder_metrics
+
+    def get_n_trees(self, model) -> int:
+        if self.model == "xgb":
+            return model.get_booster().num_boosted_rounds()
+        return model.booster_.current_iteration()
+
+    def get_warm_start_kwargs(self, prev_model) -> dict:
+        if prev_model is None:
+            return {}
+        elif self.model == "xgb":
+            return {"xgb_model": prev_model}
+        return {"init_model": prev_model}
+
+    def determine_model(self, params: dict, prev_model=None):
+        if prev_model is not None:
+            # warm started boosters only need to grow the missing trees
+            params = {
+                **params,
+                "n_estimators": params["n_estimators"]
+                - self.get_n_trees(prev_model),
+            }
+        return self._model_cls(**{**self._default_model_params, **params})
+
+    @staticmethod
+    def get_model_constructors() -> dict:
+        """(model_type, classification) -> (module, estimator class, default params)"""
+        return {
+            ("xgb", True): (
+                "xgboost",
+                "XGBClassifier",
+                {"objective": "binary:logistic", "verbosity": 0},
+            ),
+            ("xgb", False): (
+                "xgboost",
+                "XGBRegressor",
+                {"objective": "reg:squarederror", "verbosity": 0},
+            ),
+            ("lr", True): ("sklearn.linear_model", "LogisticRegression", {}),
+            ("lr", False): ("sklearn.linear_model", "LogisticRegression", {}),
+            ("knn", True): ("sklearn.neighbors", "KNeighborsClassifier", {}),
+            ("knn", False): ("sklearn.neighbors", "KNeighborsRegressor", {}),
+            ("cat", True): ("catboost", "CatBoostClassifier", {}),
+            ("cat", False): ("catboost", "CatBoostRegressor", {}),
+            ("lgb", True): ("lightgbm", "LGBMClassifier", {}),
+            ("lgb", False): ("lightgbm", "LGBMRegressor", {}),
+        }
 
 
 if __name__ == "__main__":
@@ -205,6 +733,7 @@ if __name__ == "__main__":
         cols_to_scale=list(X.columns),
         classification=True,
         metric="accuracy",
+        n_splits=5,
     )
-    hp.search_for_params(searching_algo="grid", n_splits=5)
+    hp.search_for_params(searching_algo="grid")
     print(hp.get_best_params())
@@ -1,4 +1,5 @@
 import pickle
+from typing import Optional
 
 import mlflow
 import numpy as np
@@ -22,15 +23,20 @@ class LassoModel(BaseModel):
 
     def fit_model(
         self,
-        dataset: dict = Pipeline().df,
+        dataset: Optional[dict] = None,
         class_weight_balance: str = "balanced",
         verbose: int = 2,
         max_iter: int = 333,
         target: str = "UPGRADED_FLAG",
     ) -> LogisticRegression:
+        if dataset is None:
+            dataset = vars(Pipeline().scale_final_dataset())
+
         model = LogisticRegression(
             penalty="l1",
-            solver="saga",
+            solver="liblinear",
+            dual=False,
+            tol=1e-3,
             class_weight=class_weight_balance,
             verbose=verbose,
             max_iter=max_iter,